@@ -2,13 +2,23 @@ import os
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
+from settings import GuildSettings
 
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
-PREFIX = "!"
+
+_prefixes = {}
+
+def get_prefix(bot, message):
+    prefix = bot.settings.get(message.guild.id if message.guild else None, "prefix")
+    prefixes = _prefixes.get(prefix)
+    if prefixes is None:
+        prefixes = _prefixes[prefix] = commands.when_mentioned_or(prefix)(bot, message)
+    return prefixes
 
 intents = discord.Intents.all()
-bot = commands.Bot(command_prefix=PREFIX, intents=intents)
+bot = commands.Bot(command_prefix=get_prefix, intents=intents)
+bot.settings = GuildSettings()
 
 @bot.event
 async def on_ready():
@@ -16,10 +26,14 @@ async def on_ready():
 
 async def main():
     await bot.load_extension("cogs.logger")
+    await bot.load_extension("cogs.config")
     await bot.load_extension("cogs.welcome")
     await bot.load_extension("cogs.music")
     await bot.load_extension("cogs.reminder")
-    await bot.start(TOKEN)
+    try:
+        await bot.start(TOKEN)
+    finally:
+        bot.settings.close()
 
 if __name__ == "__main__":
     import asyncio
@@ -0,0 +1,75 @@
+from discord.ext import commands, tasks
+import logging
+from settings import DEFAULTS, GLOBAL_KEYS, validate
+
+class Config(commands.Cog):
+    """
+    Manages the per-guild settings in `bot.settings`:
+      • !config - shows this server's settings.
+      • !config set [key] [value] - overrides a setting for this server.
+      • !config reset [key] - restores a setting to its config.json default.
+
+    config.json is watched and reloaded when it changes on disk.
+    """
+    def __init__(self, bot):
+        self.bot = bot
+        self.settings = bot.settings
+
+    async def cog_load(self):
+        self.watch_config.start()
+
+    async def cog_unload(self):
+        self.watch_config.cancel()
+
+    @tasks.loop(seconds=5.0)
+    async def watch_config(self):
+        if self.settings.config_changed() and self.settings.reload_defaults():
+            logging.info(f"Reloaded {self.settings.config_path}")
+            self.bot.dispatch("settings_reload")
+
+    @commands.group(name="config", invoke_without_command=True)
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    async def config_(self, ctx):
+        settings = self.settings.for_guild(ctx.guild.id)
+        overrides = self.settings.overrides(ctx.guild.id)
+        lines = "\n".join(
+            f"{key}: {value!r}" + (" (server)" if key in overrides else "")
+            for key, value in settings.items()
+        )
+        await ctx.send(f"**Settings for {ctx.guild.name}:**\n```\n{lines}\n```")
+
+    @config_.command(name="set")
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    async def config_set(self, ctx, key: str, *, value: str):
+        if key not in DEFAULTS:
+            return await ctx.send(f"Unknown setting `{key}`.")
+        if key in GLOBAL_KEYS:
+            return await ctx.send(f"`{key}` applies to every server and can only be changed in config.json.")
+
+        if type(DEFAULTS[key]) is int:
+            try:
+                value = int(value)
+            except ValueError:
+                return await ctx.send(f"`{key}` must be a whole number.")
+        error = validate(key, value)
+        if error:
+            return await ctx.send(error)
+
+        self.settings.set(ctx.guild.id, key, value)
+        await ctx.send(f"`{key}` set to `{value}`.")
+        logging.info(f"Setting {key} changed to {value!r} in {ctx.guild.name}")
+
+    @config_.command(name="reset")
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    async def config_reset(self, ctx, key: str):
+        if key not in DEFAULTS:
+            return await ctx.send(f"Unknown setting `{key}`.")
+        self.settings.reset(ctx.guild.id, key)
+        await ctx.send(f"`{key}` reset to its default.")
+        logging.info(f"Setting {key} reset in {ctx.guild.name}")
+
+async def setup(bot):
+    await bot.add_cog(Config(bot))
@@ -3,6 +3,7 @@ from discord.ext import commands
 import yt_dlp as youtube_dl
 import asyncio
 import logging
+from collections import OrderedDict, deque
 
 youtube_dl.utils.bug_reports_message = lambda: ''
 
@@ -28,17 +29,169 @@ class YTDLSource(discord.PCMVolumeTransformer):
         self.title = data.get('title')
         self.url = data.get('url')
 
-    @classmethod
-    async def from_url(cls, url, *, loop=None, stream=False):
+    @staticmethod
+    async def extract(url, *, loop=None, stream=False):
+        """
+        Resolves a URL or search query to its track info without starting FFmpeg.
+        """
         loop = loop or asyncio.get_event_loop()
         data = await loop.run_in_executor(None, lambda: ytdl.extract_info(url, download=not stream))
-        
+
         if 'entries' in data:
             data = data['entries'][0]
-        
+        return data
+
+    @classmethod
+    def from_data(cls, data, *, stream=False):
+        """
+        Spawns the FFmpeg process for already extracted track info.
+        """
         filename = data['url'] if stream else ytdl.prepare_filename(data)
         return cls(discord.FFmpegPCMAudio(filename, **ffmpeg_options), data=data)
 
+    @classmethod
+    async def from_url(cls, url, *, loop=None, stream=False):
+        data = await cls.extract(url, loop=loop, stream=stream)
+        return cls.from_data(data, stream=stream)
+
+class GuildFairLimiter:
+    """
+    A counting limiter shared by every guild.
+
+    Waiters are queued per guild and slots are handed out round-robin across
+    guilds, so a guild with many waiters can't starve the others.
+    """
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self._waiters = OrderedDict()
+
+    async def acquire(self, guild_id):
+        """
+        Waits for a slot. Returns False if the guild's waiters were dropped.
+        """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(guild_id, deque()).append(fut)
+        try:
+            return await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled() and fut.result():
+                self.release()
+            else:
+                self._discard(guild_id, fut)
+            raise
+
+    def is_full(self):
+        return self.active >= self.limit or bool(self._waiters)
+
+    def release(self):
+        self.active -= 1
+        self._wake()
+
+    def set_limit(self, limit):
+        self.limit = limit
+        self._wake()
+
+    def drop_guild(self, guild_id):
+        """
+        Wakes every waiter of a guild without granting it a slot.
+        """
+        for fut in self._waiters.pop(guild_id, ()):
+            if not fut.done():
+                fut.set_result(False)
+
+    def _discard(self, guild_id, fut):
+        waiters = self._waiters.get(guild_id)
+        if waiters and fut in waiters:
+            waiters.remove(fut)
+            if not waiters:
+                del self._waiters[guild_id]
+
+    def _wake(self):
+        while self.active < self.limit and self._waiters:
+            guild_id, waiters = next(iter(self._waiters.items()))
+            fut = waiters.popleft()
+            if waiters:
+                self._waiters.move_to_end(guild_id)
+            else:
+                del self._waiters[guild_id]
+            if fut.done():
+                continue
+            self.active += 1
+            fut.set_result(True)
+
+class MusicResourceManager:
+    """
+    Budgets the Music cog's resources across guilds:
+      • at most `max_ffmpeg` FFmpeg processes run at once,
+      • at most `max_extractions` yt-dlp extractions run at once,
+      • at most `music_max_pending_per_guild` extractions are pending per guild,
+      • idle voice connections are reclaimed after `music_idle_timeout` seconds.
+    The per-guild limits are read from `bot.settings`.
+    """
+    def __init__(self, bot, *, max_ffmpeg=4, max_extractions=2):
+        self.bot = bot
+        self.settings = bot.settings
+        self.ffmpeg = GuildFairLimiter(max_ffmpeg)
+        self.extractions = GuildFairLimiter(max_extractions)
+        self._pending = {}
+        self._idle_tasks = {}
+
+    def reserve_extraction(self, guild_id):
+        pending = self._pending.get(guild_id, 0)
+        if pending >= self.settings.get(guild_id, "music_max_pending_per_guild"):
+            return False
+        self._pending[guild_id] = pending + 1
+        return True
+
+    def finish_extraction(self, guild_id):
+        pending = self._pending.get(guild_id, 0) - 1
+        if pending > 0:
+            self._pending[guild_id] = pending
+        else:
+            self._pending.pop(guild_id, None)
+
+    def schedule_idle(self, guild_id, callback):
+        """
+        Runs `callback()` after the grace period unless cancelled first.
+        An already running timer is left untouched.
+        """
+        if guild_id in self._idle_tasks:
+            return
+        self._idle_tasks[guild_id] = self.bot.loop.create_task(self._idle_timer(guild_id, callback))
+
+    def cancel_idle(self, guild_id):
+        task = self._idle_tasks.pop(guild_id, None)
+        if task and task is not asyncio.current_task():
+            task.cancel()
+
+    async def _idle_timer(self, guild_id, callback):
+        try:
+            await asyncio.sleep(self.settings.get(guild_id, "music_idle_timeout"))
+        except asyncio.CancelledError:
+            return
+        self._idle_tasks.pop(guild_id, None)
+        try:
+            await callback()
+        except Exception as e:
+            logging.error(f"Error reclaiming idle voice connection for guild {guild_id}: {e}")
+
+    def release_guild(self, guild_id):
+        """
+        Forgets everything held for a guild that is being torn down.
+        """
+        self.cancel_idle(guild_id)
+        self.ffmpeg.drop_guild(guild_id)
+        self.extractions.drop_guild(guild_id)
+
+    def close(self):
+        for guild_id in list(self._idle_tasks):
+            self.cancel_idle(guild_id)
+
 class Music(commands.Cog):
     """
     A Music cog that supports:
@@ -50,27 +203,96 @@ class Music(commands.Cog):
       • !queue - displays the current music queue.
       • !clearqueue - clears the queue.
       • !join, !disc (alias for disconnect) and !leave.
+
+    The bot leaves a voice channel on its own once it has been idle (nothing
+    playing, paused, or nobody else listening) for the guild's `music_idle_timeout`
+    seconds.
     """
     def __init__(self, bot):
         self.bot = bot
         self.music_queues = {}
         self.stop_flags = {}
+        self.starting = set()
+        self.resources = MusicResourceManager(
+            bot,
+            max_ffmpeg=bot.settings.defaults["music_max_ffmpeg_processes"],
+            max_extractions=bot.settings.defaults["music_max_extractions"],
+        )
         logging.info("Music cog initialized.")
 
+    @commands.Cog.listener()
+    async def on_settings_reload(self):
+        defaults = self.bot.settings.defaults
+        self.resources.ffmpeg.set_limit(defaults["music_max_ffmpeg_processes"])
+        self.resources.extractions.set_limit(defaults["music_max_extractions"])
+
+    async def cog_unload(self):
+        self.resources.close()
+        for voice_client in list(self.bot.voice_clients):
+            await self.teardown(voice_client.guild)
+
+    def is_idle(self, guild):
+        """
+        A paused guild counts as idle, so a pause longer than the grace period
+        gives its FFmpeg slot back to the other guilds.
+        """
+        voice_client = guild.voice_client
+        if not voice_client or not voice_client.channel:
+            return False
+        if not any(not member.bot for member in voice_client.channel.members):
+            return True
+        return not (voice_client.is_playing() or guild.id in self.starting)
+
+    def check_idle(self, guild):
+        """
+        Starts the idle timer for a guild's voice connection, or cancels it if
+        the connection is in use again.
+        """
+        if self.is_idle(guild):
+            self.resources.schedule_idle(guild.id, lambda: self.on_idle(guild))
+        else:
+            self.resources.cancel_idle(guild.id)
+
+    async def on_idle(self, guild):
+        if self.is_idle(guild):
+            logging.info(f"Leaving idle voice channel in {guild.name}")
+            await self.teardown(guild)
+
+    async def teardown(self, guild):
+        """
+        Frees the queue, flags and budget held for a guild and disconnects.
+        """
+        self.music_queues.pop(guild.id, None)
+        self.stop_flags.pop(guild.id, None)
+        self.starting.discard(guild.id)
+        self.resources.release_guild(guild.id)
+        if guild.voice_client:
+            await guild.voice_client.disconnect()
+            logging.info(f"Disconnected from voice channel in {guild.name}")
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member, before, after):
+        guild = member.guild
+        if member == self.bot.user and after.channel is None:
+            await self.teardown(guild)
+            return
+        if guild.voice_client:
+            self.check_idle(guild)
+
     @commands.command(name="join")
     async def join(self, ctx):
         if ctx.author.voice:
             channel = ctx.author.voice.channel
             await channel.connect()
             logging.info(f"Joined voice channel: {channel.name} in {ctx.guild.name}")
+            self.check_idle(ctx.guild)
         else:
             await ctx.send("You need to join a voice channel first.")
 
     @commands.command(name="leave")
     async def leave(self, ctx):
         if ctx.voice_client:
-            await ctx.voice_client.disconnect()
-            logging.info(f"Disconnected from voice channel in {ctx.guild.name}")
+            await self.teardown(ctx.guild)
         else:
             await ctx.send("I'm not in a voice channel.")
 
@@ -78,20 +300,56 @@ class Music(commands.Cog):
     async def disc(self, ctx):
         await self.leave(ctx)
 
+    async def start_playing(self, ctx, data):
+        """
+        Waits for an FFmpeg slot, then starts playing `data`. The slot is held
+        until the track ends.
+        """
+        guild = ctx.guild
+        self.starting.add(guild.id)
+        self.resources.cancel_idle(guild.id)
+        try:
+            if self.resources.ffmpeg.is_full():
+                await ctx.send(f"Waiting for a free audio slot to play **{data.get('title')}**...")
+            if not await self.resources.ffmpeg.acquire(guild.id):
+                return
+            voice_client = ctx.voice_client
+            if not voice_client or not voice_client.is_connected():
+                self.resources.ffmpeg.release()
+                return
+            source = None
+            try:
+                source = YTDLSource.from_data(data, stream=True)
+                voice_client.play(source, after=lambda e: self.after_playing(ctx, e))
+            except Exception as e:
+                if source:
+                    source.cleanup()
+                self.resources.ffmpeg.release()
+                await ctx.send("An error occurred while starting the song.")
+                logging.error(f"Error starting playback: {e}")
+                return
+        finally:
+            self.starting.discard(guild.id)
+            self.check_idle(guild)
+
+        await ctx.send(f"Now playing: **{source.title}**")
+        logging.info(f"Started playing: {source.title}")
+
+    def after_playing(self, ctx, error):
+        if error:
+            logging.error(f"Player error in {ctx.guild.name}: {error}")
+        self.bot.loop.call_soon_threadsafe(self.resources.ffmpeg.release)
+        asyncio.run_coroutine_threadsafe(self.check_queue(ctx), self.bot.loop)
+
     async def check_queue(self, ctx):
         guild_id = ctx.guild.id
         if self.stop_flags.get(guild_id, False):
             self.stop_flags[guild_id] = False
+        elif guild_id in self.music_queues and self.music_queues[guild_id]:
+            next_data = self.music_queues[guild_id].pop(0)
+            await self.start_playing(ctx, next_data)
             return
-
-        if guild_id in self.music_queues and self.music_queues[guild_id]:
-            next_source = self.music_queues[guild_id].pop(0)
-            ctx.voice_client.play(
-                next_source,
-                after=lambda e: self.bot.loop.create_task(self.check_queue(ctx))
-            )
-            await ctx.send(f"Now playing: **{next_source.title}**")
-            logging.info(f"Started playing: {next_source.title}")
+        self.check_idle(ctx.guild)
 
     @commands.command(name="play")
     async def play(self, ctx, *, query: str):
@@ -102,31 +360,40 @@ class Music(commands.Cog):
             await ctx.author.voice.channel.connect()
             logging.info(f"Connected to voice channel: {ctx.author.voice.channel.name}")
 
+        guild_id = ctx.guild.id
+        if not self.resources.reserve_extraction(guild_id):
+            return await ctx.send("Too many songs are being searched for already, please wait.")
+
         await ctx.send("Searching for the song...")
         try:
-            source = await YTDLSource.from_url(query, loop=self.bot.loop, stream=True)
+            if not await self.resources.extractions.acquire(guild_id):
+                return await ctx.send("Playback was stopped before the song could be found.")
+            try:
+                data = await YTDLSource.extract(query, loop=self.bot.loop, stream=True)
+            finally:
+                self.resources.extractions.release()
         except Exception as e:
             await ctx.send("An error occurred while processing the song.")
             logging.error(f"Error in play command: {e}")
             return
+        finally:
+            self.resources.finish_extraction(guild_id)
+
+        if not ctx.voice_client:
+            return await ctx.send(f"I left the voice channel before **{data.get('title')}** could be played.")
 
-        guild_id = ctx.guild.id
         if guild_id not in self.music_queues:
             self.music_queues[guild_id] = []
         if guild_id not in self.stop_flags:
             self.stop_flags[guild_id] = False
 
-        if not ctx.voice_client.is_playing():
-            ctx.voice_client.play(
-                source,
-                after=lambda e: self.bot.loop.create_task(self.check_queue(ctx))
-            )
-            await ctx.send(f"Now playing: **{source.title}**")
-            logging.info(f"Started playing: {source.title}")
+        voice_client = ctx.voice_client
+        if not (voice_client.is_playing() or voice_client.is_paused() or guild_id in self.starting):
+            await self.start_playing(ctx, data)
         else:
-            self.music_queues[guild_id].append(source)
-            await ctx.send(f"**{source.title}** has been added to the queue.")
-            logging.info(f"Added to queue: {source.title}")
+            self.music_queues[guild_id].append(data)
+            await ctx.send(f"**{data.get('title')}** has been added to the queue.")
+            logging.info(f"Added to queue: {data.get('title')}")
 
     @commands.command(name="pause")
     async def pause(self, ctx):
@@ -134,6 +401,7 @@ class Music(commands.Cog):
             ctx.voice_client.pause()
             await ctx.send("Music paused.")
             logging.info(f"Paused music in {ctx.guild.name}")
+            self.check_idle(ctx.guild)
         else:
             await ctx.send("No music is playing to pause.")
 
@@ -144,6 +412,7 @@ class Music(commands.Cog):
             ctx.voice_client.resume()
             await ctx.send("Music resumed.")
             logging.info(f"Resumed music in {ctx.guild.name}")
+            self.check_idle(ctx.guild)
         else:
             await ctx.send("No music is paused.")
 
@@ -170,7 +439,7 @@ class Music(commands.Cog):
     async def queue_(self, ctx):
         guild_id = ctx.guild.id
         if guild_id in self.music_queues and self.music_queues[guild_id]:
-            queue_list = "\n".join(f"{i+1}. {source.title}" for i, source in enumerate(self.music_queues[guild_id]))
+            queue_list = "\n".join(f"{i+1}. {data.get('title')}" for i, data in enumerate(self.music_queues[guild_id]))
             await ctx.send(f"**Current Queue:**\n{queue_list}")
         else:
             await ctx.send("The queue is empty.")
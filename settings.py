@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+import sqlite3
+
+CONFIG_PATH = "config.json"
+DB_PATH = "settings.db"
+
+DEFAULTS = {
+    "prefix": "!",
+    "welcome_message": "Welcome to the server, {member}!",
+    "welcome_channel": "welcome",
+    "members_role_name": "Members",
+    "music_idle_timeout": 300,
+    "music_max_ffmpeg_processes": 4,
+    "music_max_extractions": 2,
+    "music_max_pending_per_guild": 3,
+}
+
+# Settings that apply to the whole bot and can't be overridden per guild.
+GLOBAL_KEYS = {"music_max_ffmpeg_processes", "music_max_extractions"}
+
+def validate(key, value):
+    """
+    Checks a value against the type and range of its built-in default.
+    Returns an error message, or None if the value is usable.
+    """
+    expected = type(DEFAULTS[key])
+    if type(value) is not expected:
+        return f"`{key}` must be a {'whole number' if expected is int else 'string'}."
+    if expected is int and value <= 0:
+        return f"`{key}` must be greater than zero."
+    if key == "prefix" and (not value or any(c.isspace() for c in value)):
+        return "The prefix can't be empty or contain spaces."
+    if key == "welcome_message":
+        try:
+            value.format(member="x")
+        except (AttributeError, KeyError, IndexError, ValueError):
+            return "The welcome message can only use the `{member}` placeholder."
+    return None
+
+class GuildSettings:
+    """
+    Per-guild settings shared by every cog.
+
+    config.json holds the defaults; per-guild overrides live in a SQLite table
+    keyed by (guild_id, key). Each guild's merged settings are cached in
+    memory, so a lookup is two dict reads. Guilds without overrides share the
+    defaults dict itself. Writes go straight to the database and invalidate
+    the guild's cache entry; reloading config.json clears the whole cache.
+    """
+    def __init__(self, config_path=CONFIG_PATH, db_path=DB_PATH):
+        self.config_path = config_path
+        self.config_mtime = None
+        self.defaults = dict(DEFAULTS)
+        self._cache = {}
+
+        self._db = sqlite3.connect(db_path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS guild_settings ("
+            "guild_id INTEGER NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+            "PRIMARY KEY (guild_id, key))"
+        )
+        self._db.commit()
+        self.reload_defaults()
+
+    def reload_defaults(self):
+        """
+        Re-reads config.json. Returns False and keeps the current defaults if
+        the file can't be read or holds an invalid value. Keys without a
+        built-in default are ignored.
+        """
+        try:
+            mtime = os.path.getmtime(self.config_path)
+            with open(self.config_path, "r") as f:
+                config = json.load(f)
+        except Exception as e:
+            logging.error(f"Error loading {self.config_path}: {e}")
+            return False
+
+        if not isinstance(config, dict):
+            errors = ["the file must contain a JSON object."]
+        else:
+            errors = [error for key, value in config.items()
+                      if key in DEFAULTS and (error := validate(key, value))]
+        if errors:
+            self.config_mtime = mtime
+            logging.error(f"Error loading {self.config_path}: {' '.join(errors)}")
+            return False
+
+        self.defaults = {**DEFAULTS, **{key: value for key, value in config.items() if key in DEFAULTS}}
+        self.config_mtime = mtime
+        self._cache.clear()
+        return True
+
+    def config_changed(self):
+        try:
+            return os.path.getmtime(self.config_path) != self.config_mtime
+        except OSError:
+            return False
+
+    def get(self, guild_id, key):
+        """
+        Returns a setting for a guild, or the default when `guild_id` is None.
+        """
+        settings = self._cache.get(guild_id)
+        if settings is None:
+            settings = self._load(guild_id)
+        return settings.get(key)
+
+    def for_guild(self, guild_id):
+        """
+        Returns the merged settings of a guild. The dict is shared, don't mutate it.
+        """
+        settings = self._cache.get(guild_id)
+        if settings is None:
+            settings = self._load(guild_id)
+        return settings
+
+    def overrides(self, guild_id):
+        rows = self._db.execute(
+            "SELECT key, value FROM guild_settings WHERE guild_id = ?", (guild_id,)
+        ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def set(self, guild_id, key, value):
+        with self._db:
+            self._db.execute(
+                "INSERT INTO guild_settings (guild_id, key, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (guild_id, key) DO UPDATE SET value = excluded.value",
+                (guild_id, key, json.dumps(value)),
+            )
+        self._cache.pop(guild_id, None)
+
+    def reset(self, guild_id, key=None):
+        with self._db:
+            if key is None:
+                self._db.execute("DELETE FROM guild_settings WHERE guild_id = ?", (guild_id,))
+            else:
+                self._db.execute(
+                    "DELETE FROM guild_settings WHERE guild_id = ? AND key = ?", (guild_id, key)
+                )
+        self._cache.pop(guild_id, None)
+
+    def close(self):
+        self._db.close()
+
+    def _load(self, guild_id):
+        settings = self.defaults
+        if guild_id is not None:
+            overrides = self.overrides(guild_id)
+            if overrides:
+                settings = {**self.defaults, **overrides}
+        self._cache[guild_id] = settings
+        return settings